@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Configuración estática de la GraphRAG API
+Inmutable tras el import: las rutas se interpolan una sola vez aquí
+en vez de reconstruirse con f-strings en cada uso.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    """Immutable runtime configuration with paths resolved once"""
+
+    root: Path = Path(".")  # Ya estamos en ragtest
+    community_level: int = 2
+    claim_extraction_enabled: bool = False
+    response_type: str = "Multiple Paragraphs"
+    cli_timeout_seconds: int = 300
+
+    @property
+    def output_dir(self) -> Path:
+        return self.root / "output"
+
+    def parquet_path(self, name: str) -> Path:
+        return self.output_dir / f"{name}.parquet"
+
+
+CFG = Settings()
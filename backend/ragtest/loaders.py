@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Carga optimizada de los parquet del índice GraphRAG
+Compartida por main.py y worker.py: proyección de columnas, sidecar Arrow IPC
+memory-mapped y reducción de dtypes, para no duplicar cargas sin optimizar.
+"""
+
+import logging
+import os
+from typing import List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+# Lector parquet alternativo (polars), opcional
+try:
+    import polars as pl
+    POLARS_AVAILABLE = True
+    logger.info("✅ polars disponible para carga de parquet")
+except ImportError:
+    POLARS_AVAILABLE = False
+    logger.info("ℹ️ polars no disponible, usando lector pyarrow")
+
+# Columnas que las funciones de búsqueda de GraphRAG realmente consultan;
+# parquet es columnar, así que proyectar aquí evita leer y decodificar el resto
+NEEDED_COLS = {
+    "entities": [
+        "id", "human_readable_id", "title", "type", "description",
+        "text_unit_ids", "frequency", "degree", "description_embedding",
+    ],
+    "communities": [
+        "id", "human_readable_id", "community", "level", "parent", "children",
+        "title", "entity_ids", "relationship_ids", "text_unit_ids",
+        "period", "size",
+    ],
+    "community_reports": [
+        "id", "human_readable_id", "community", "level", "parent", "children",
+        "title", "summary", "full_content", "rank", "rating_explanation",
+        "findings", "full_content_json", "period", "size",
+    ],
+    "text_units": [
+        "id", "human_readable_id", "text", "n_tokens", "document_ids",
+        "entity_ids", "relationship_ids", "covariate_ids", "text_embedding",
+    ],
+    "relationships": [
+        "id", "human_readable_id", "source", "target", "description",
+        "weight", "combined_degree", "text_unit_ids",
+    ],
+}
+
+
+def _optimize_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """Shrink a read-only frame in place: downcast ints, categorize strings.
+
+    Low-cardinality object columns (type, community labels...) become
+    categoricals and 64-bit ids drop to the smallest fitting integer width.
+    List-valued columns (text_unit_ids etc.) are unhashable and left as-is.
+    """
+    if not len(frame):
+        return frame
+    for col in frame.columns:
+        dtype = frame[col].dtype
+        if pd.api.types.is_integer_dtype(dtype):
+            frame[col] = pd.to_numeric(frame[col], downcast="integer")
+        elif dtype == object:
+            try:
+                if frame[col].nunique() / len(frame) < 0.5:
+                    frame[col] = frame[col].astype("category")
+            except TypeError:
+                continue
+    return frame
+
+
+def _write_arrow_ipc(table: "pa.Table", ipc_path: str) -> None:
+    """Persist a loaded table as an Arrow IPC file (atomically, for N workers)"""
+    tmp_path = f"{ipc_path}.tmp.{os.getpid()}"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, ipc_path)
+
+
+def _read_arrow_ipc(ipc_path: str, columns: List[str]) -> Optional["pa.Table"]:
+    """Memory-map an Arrow IPC file so workers share the physical pages.
+
+    Returns None when the sidecar lacks a requested column (written with an
+    older NEEDED_COLS projection), forcing a re-read of the parquet.
+    """
+    with pa.memory_map(ipc_path) as source:
+        table = pa.ipc.open_file(source).read_all()
+    if any(col not in table.schema.names for col in columns):
+        return None
+    return table.select(columns) if columns else table
+
+
+def load_frame(path: str, name: str) -> pd.DataFrame:
+    """Load a parquet file reading only the columns search actually uses.
+
+    A memory-mapped Arrow IPC sidecar (written on first boot) is preferred so
+    that with workers>1 every worker shares the same physical pages instead of
+    re-decoding the parquet. Otherwise polars (memory-mapped, row groups
+    decoded in parallel, Arrow-backed columns) is used, falling back to the
+    pyarrow reader when polars is not installed.
+    """
+    schema_names = pq.read_schema(path).names
+    columns = [col for col in NEEDED_COLS[name] if col in schema_names]
+
+    ipc_path = f"{path}.arrow"
+    try:
+        if os.path.exists(ipc_path) and os.path.getmtime(ipc_path) >= os.path.getmtime(path):
+            table = _read_arrow_ipc(ipc_path, columns)
+            if table is not None:
+                return _optimize_frame(table.to_pandas(split_blocks=True))
+            logger.info(f"ℹ️ Cache Arrow IPC de {name} con proyección antigua, releyendo parquet")
+    except Exception as e:
+        logger.warning(f"⚠️ Cache Arrow IPC de {name} ilegible, releyendo parquet: {e}")
+
+    if POLARS_AVAILABLE:
+        try:
+            frame = pl.read_parquet(
+                path,
+                columns=columns or None,
+                memory_map=True,
+                parallel="row_groups",
+                low_memory=False,
+            )
+            try:
+                _write_arrow_ipc(frame.to_arrow(), ipc_path)
+            except Exception as e:
+                logger.info(f"ℹ️ No se pudo escribir cache Arrow IPC de {name}: {e}")
+            return _optimize_frame(frame.to_pandas(use_pyarrow_extension_array=True))
+        except Exception as e:
+            logger.warning(f"⚠️ Lectura polars de {name} falló, usando pyarrow: {e}")
+
+    table = pq.read_table(path, columns=columns or None, use_threads=True)
+    try:
+        _write_arrow_ipc(table, ipc_path)
+    except Exception as e:
+        logger.info(f"ℹ️ No se pudo escribir cache Arrow IPC de {name}: {e}")
+    return _optimize_frame(table.to_pandas(self_destruct=True, split_blocks=True))
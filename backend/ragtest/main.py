@@ -6,26 +6,40 @@ Ejecutar desde: ~/proyectos/interno/graphrag/graphragnew/graphrag-main/ragtest
 """
 
 import asyncio
-import subprocess
+import functools
+import os
 import json
+import re
+import sys
 import time
+from hashlib import blake2b
 from pathlib import Path
 from typing import Union, List, Dict, Any, Optional
 import logging
 from contextlib import asynccontextmanager
 
 import pandas as pd
+import pyarrow as pa
 from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel
 import uvicorn
 
-# Configuración
-PROJECT_DIRECTORY = "."  # Ya estamos en ragtest
-COMMUNITY_LEVEL = 2
-CLAIM_EXTRACTION_ENABLED = False
-RESPONSE_TYPE = "Multiple Paragraphs"
+# Configuración (inmutable, rutas interpoladas una sola vez)
+from config import CFG
+from loaders import load_frame
+WORKER_POOL_SIZE = 2  # workers persistentes para el fallback CLI
+WORKER_STARTUP_TIMEOUT_SECONDS = 120
+
+# Cache de resultados de búsqueda
+CACHE_MAXSIZE = 10_000
+CACHE_TTL_SECONDS = 3600
+SEMANTIC_CACHE_THRESHOLD = 0.95  # similitud coseno mínima para reusar un resultado
+SEMANTIC_CACHE_MODEL = "all-MiniLM-L6-v2"
+SEMANTIC_INDEX_MAXSIZE = CACHE_MAXSIZE  # al llegar aquí el índice se vacía y re-puebla
+STREAM_ROW_BATCH = 256  # filas de context_data codificadas por chunk
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -42,92 +56,461 @@ except ImportError as e:
     logger.warning(f"⚠️ GraphRAG API no disponible: {e}")
     logger.info("🔄 Usando fallback CLI")
 
+# Cache exacta (cachetools) con fallback propio si no está instalado
+try:
+    from cachetools import TTLCache
+    CACHETOOLS_AVAILABLE = True
+except ImportError:
+    CACHETOOLS_AVAILABLE = False
+    logger.info("ℹ️ cachetools no disponible, usando TTL cache interna")
+
+# Event loop acelerado (uvloop + httptools), opcional
+try:
+    import uvloop  # noqa: F401
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+    logger.info("ℹ️ uvloop no disponible, usando loop asyncio estándar")
+
+try:
+    import httptools  # noqa: F401
+    HTTPTOOLS_AVAILABLE = True
+except ImportError:
+    HTTPTOOLS_AVAILABLE = False
+
+# Compresión brotli (mejor ratio que gzip), opcional
+try:
+    from brotli_asgi import BrotliMiddleware
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+# Serialización JSON acelerada (orjson), opcional
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    logger.info("ℹ️ orjson no disponible, usando json estándar")
+
+# Cache semántica (faiss + sentence-transformers), opcional
+try:
+    import faiss
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+    SEMANTIC_CACHE_AVAILABLE = True
+    logger.info("✅ Cache semántica disponible (faiss + sentence-transformers)")
+except ImportError as e:
+    SEMANTIC_CACHE_AVAILABLE = False
+    logger.info(f"ℹ️ Cache semántica no disponible: {e}")
+
+
+class SimpleTTLCache:
+    """Minimal TTLCache replacement used when cachetools is not installed"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: Dict[str, Any] = {}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        expires, value = entry
+        if expires < time.monotonic():
+            del self._data[key]
+            return default
+        return value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if len(self._data) >= self.maxsize:
+            # Expulsar la entrada más antigua (orden de inserción)
+            self._data.pop(next(iter(self._data)), None)
+        self._data[key] = (time.monotonic() + self.ttl, value)
+
+
+# Utilidades de cache para los endpoints de búsqueda
+def make_cache_key(method: str, query: str) -> str:
+    """Build the exact-match cache key for a search request"""
+    raw = f"{method}|{query}|{CFG.community_level}|{CFG.response_type}".encode()
+    return blake2b(raw).hexdigest()
+
+
+def _embed_query(query: str) -> "np.ndarray":
+    """Embed a query with the small sentence-transformer, L2-normalized"""
+    vector = app.state.query_embedder.encode([query], convert_to_numpy=True)
+    vector = np.ascontiguousarray(vector, dtype=np.float32)
+    faiss.normalize_L2(vector)
+    return vector
+
+
+async def _cache_lookup(key: str, query: str, method: str) -> Optional[bytes]:
+    """Two-tier lookup: exact hash first, then semantic similarity.
+
+    Each method keeps its own semantic index so a query answered by
+    /search/global can never be served as a /search/local hit. The model
+    forward pass runs in a thread to keep the event loop responsive.
+    """
+    cached = app.state.exact_cache.get(key)
+    if cached is not None:
+        return cached
+
+    index = app.state.semantic_indexes.get(method)
+    if index is not None and index.ntotal > 0:
+        vector = await asyncio.to_thread(_embed_query, query)
+        scores, indices = index.search(vector, 1)
+        if scores[0][0] > SEMANTIC_CACHE_THRESHOLD:
+            similar_key = app.state.semantic_keys[method][indices[0][0]]
+            return app.state.exact_cache.get(similar_key)
+    return None
+
+
+async def _cache_store(key: str, query: str, method: str, payload: bytes) -> None:
+    """Store a successful, already-serialized search result in both cache tiers"""
+    app.state.exact_cache[key] = payload
+    if not app.state.semantic_enabled:
+        return
+    vector = await asyncio.to_thread(_embed_query, query)
+    index = app.state.semantic_indexes.get(method)
+    if index is None:
+        index = faiss.IndexFlatIP(app.state.semantic_dimension)
+        app.state.semantic_indexes[method] = index
+        app.state.semantic_keys[method] = []
+    elif index.ntotal >= SEMANTIC_INDEX_MAXSIZE:
+        # La capa exacta expira por TTL pero IndexFlatIP solo crece: vaciarlo
+        # al llegar al tope evita la fuga y los hits sobre claves ya expiradas
+        index.reset()
+        app.state.semantic_keys[method].clear()
+        logger.info(f"♻️ Índice semántico de {method} reiniciado al alcanzar {SEMANTIC_INDEX_MAXSIZE} entradas")
+    index.add(vector)
+    app.state.semantic_keys[method].append(key)
+
+
+def _encode_payload(response_dict: Dict[str, Any]) -> bytes:
+    """Encode the full response to JSON bytes (runs off-loop via to_thread)"""
+    return b"".join(_stream_json(response_dict))
+
+
+PAYLOAD_CHUNK_BYTES = 64 * 1024
+
+
+def _iter_payload(payload: bytes):
+    """Yield pre-encoded bytes in chunks so large responses don't go out
+    as a single write"""
+    for start in range(0, len(payload), PAYLOAD_CHUNK_BYTES):
+        yield payload[start:start + PAYLOAD_CHUNK_BYTES]
+
+
+def cached_search(method: str):
+    """Decorator: serve repeated queries from the two-tier cache,
+    coalescing identical in-flight requests into a single execution"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(query: str):
+            key = make_cache_key(method, query)
+            cached = await _cache_lookup(key, query, method)
+            if cached is not None:
+                logger.info(f"⚡ Cache hit ({method}): {query}")
+                return ORJSONResponse(content=cached)
+
+            # Single-flight: si la misma query ya está en curso, esperar su resultado
+            inflight = app.state.inflight
+            existing = inflight.get(key)
+            if existing is not None:
+                logger.info(f"🤝 Coalescing ({method}): {query}")
+                return ORJSONResponse(content=await asyncio.shield(existing))
+
+            future = asyncio.get_running_loop().create_future()
+            inflight[key] = future
+            try:
+                response_dict = await func(query)
+                # Codificar fuera del loop y resolver antes de responder:
+                # si el líder corta la conexión, los coalescidos y la caché
+                # ya tienen el payload (no dependen de que se consuma el body)
+                payload = await asyncio.to_thread(_encode_payload, response_dict)
+                await _cache_store(key, query, method, payload)
+                future.set_result(payload)
+            except BaseException as e:
+                future.set_exception(e)
+                # Evitar "exception was never retrieved" si nadie más esperaba
+                future.exception()
+                raise
+            finally:
+                inflight.pop(key, None)
+            return StreamingResponse(
+                _iter_payload(payload),
+                media_type="application/json"
+            )
+        return wrapper
+    return decorator
+
 # Utilidades para procesar context data
+def _dumps(obj: Any) -> bytes:
+    """Encode to JSON bytes via orjson, with a stdlib fallback"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(
+            obj,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_SERIALIZE_DATACLASS,
+        )
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=str).encode()
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse that encodes once with orjson (C extension) and passes
+    pre-encoded bytes through untouched, so cache hits skip re-encoding"""
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return _dumps(content)
+
+
+def _stream_json(response_dict: Dict[str, Any]):
+    """Yield a dict as JSON chunks; large record lists are encoded in row
+    batches so no single orjson call materializes the whole payload"""
+    yield b"{"
+    first = True
+    for key, value in response_dict.items():
+        if not first:
+            yield b","
+        first = False
+        yield _dumps(key) + b":"
+        if isinstance(value, list) and len(value) > STREAM_ROW_BATCH:
+            yield b"["
+            for start in range(0, len(value), STREAM_ROW_BATCH):
+                batch = _dumps(value[start:start + STREAM_ROW_BATCH])[1:-1]
+                yield batch if start == 0 else b"," + batch
+            yield b"]"
+        elif isinstance(value, dict):
+            yield from _stream_json(value)
+        else:
+            yield _dumps(value)
+    yield b"}"
+
+
+def _frame_to_records(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Convert a context DataFrame to records, reusing rows precomputed at load.
+
+    The reference frames (communities, community_reports) are immutable after
+    startup; a slice is only substituted when its column set is identical to
+    a precomputed table's and every id is covered by that same table, so a
+    context frame with builder-derived columns (or ids from another table)
+    always falls through to a fresh to_dict('records').
+    """
+    records_by_id = getattr(app.state, "records_by_id", None)
+    if records_by_id and "id" in frame.columns:
+        frame_columns = frozenset(frame.columns)
+        ids = frame["id"].tolist()
+        if ids:
+            for table_columns, table_map in records_by_id.values():
+                if frame_columns == table_columns and all(row_id in table_map for row_id in ids):
+                    return [table_map[row_id] for row_id in ids]
+    return frame.to_dict(orient="records")
+
+
 def convert_response_to_string(response: Union[str, Dict[str, Any], List[Dict[str, Any]]]) -> str:
     """Convert a response to string format"""
     if isinstance(response, (dict, list)):
+        if ORJSON_AVAILABLE:
+            return orjson.dumps(response, option=orjson.OPT_INDENT_2).decode()
         return json.dumps(response, indent=2)
     elif isinstance(response, str):
         return response
     else:
         return str(response)
 
-def recursively_convert(obj: Any) -> Any:
-    """Recursively convert pandas objects to serializable format"""
-    if isinstance(obj, pd.DataFrame):
-        return obj.to_dict(orient="records")
-    elif isinstance(obj, list):
-        return [recursively_convert(item) for item in obj]
-    elif isinstance(obj, dict):
-        return {key: recursively_convert(value) for key, value in obj.items()}
-    return obj
-
 def process_context_data(context_data: Union[str, List[pd.DataFrame], Dict, pd.DataFrame]) -> Any:
-    """Process context data for JSON serialization"""
+    """Flatten GraphRAG context data to JSON-encodable structures.
+
+    GraphRAG contexts are a DataFrame, or a dict/list of DataFrames one level
+    deep; DataFrames become record lists and everything else (numpy scalars
+    included) is left for orjson's C-level traversal to encode.
+    """
     if isinstance(context_data, str):
         return context_data
     if isinstance(context_data, pd.DataFrame):
-        return context_data.to_dict(orient="records")
-    if isinstance(context_data, (list, dict)):
-        return recursively_convert(context_data)
+        return _frame_to_records(context_data)
+    if isinstance(context_data, dict):
+        return {
+            key: _frame_to_records(value) if isinstance(value, pd.DataFrame) else value
+            for key, value in context_data.items()
+        }
+    if isinstance(context_data, list):
+        return [
+            _frame_to_records(item) if isinstance(item, pd.DataFrame) else item
+            for item in context_data
+        ]
     return None
 
+# Índice vectorial de entidades (FAISS HNSW) construido una vez en el arranque
+def _detect_embedding_column(frame: pd.DataFrame) -> Optional[str]:
+    """Find a list-of-floats embedding column in a loaded frame, if any"""
+    if not len(frame):
+        return None
+    for col in frame.columns:
+        if col.endswith("_embedding"):
+            first = frame[col].iloc[0]
+            if hasattr(first, "__len__") and not isinstance(first, str):
+                return col
+    return None
+
+
+def _build_entity_index(entities: pd.DataFrame) -> bool:
+    """Build an HNSW index over entity embeddings so nearest-neighbor lookups
+    are O(log N) instead of a full scan of the entities frame"""
+    column = _detect_embedding_column(entities)
+    if column is None:
+        logger.info("ℹ️ entities sin columna de embeddings, índice vectorial omitido")
+        return False
+
+    vectors = np.ascontiguousarray(np.vstack(entities[column].to_numpy()), dtype=np.float32)
+    faiss.normalize_L2(vectors)
+    index = faiss.IndexHNSWFlat(vectors.shape[1], 32)
+    index.hnsw.efConstruction = 200
+    index.add(vectors)
+    app.state.entity_index = index
+    app.state.entity_ids = entities["id"].to_numpy()
+    logger.info(f"✅ Índice HNSW de entidades construido ({index.ntotal} vectores, dim={vectors.shape[1]})")
+    return True
+
+
+def entity_vector_search(query_vector: "np.ndarray", k: int = 10):
+    """Nearest entities by embedding: returns (ids, scores) from the HNSW index.
+
+    Thin retriever hook for the local/DRIFT context builders; callers must
+    check app.state.entity_index and fall back to the frame scan if None.
+    """
+    vector = np.ascontiguousarray(query_vector, dtype=np.float32).reshape(1, -1)
+    faiss.normalize_L2(vector)
+    scores, positions = app.state.entity_index.search(vector, k)
+    valid = positions[0] >= 0
+    return app.state.entity_ids[positions[0][valid]], scores[0][valid]
+
+
+# Pool de workers persistentes para el fallback CLI: cada spawn de
+# "graphrag query" paga arranque de intérprete + imports; un worker los paga una vez
+async def _spawn_worker() -> asyncio.subprocess.Process:
+    """Start a persistent search worker and wait for its ready handshake"""
+    worker = await asyncio.create_subprocess_exec(
+        sys.executable, str(Path(__file__).with_name("worker.py")),
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        cwd="."
+    )
+    ready_line = await asyncio.wait_for(
+        worker.stdout.readline(), timeout=WORKER_STARTUP_TIMEOUT_SECONDS
+    )
+    handshake = json.loads(ready_line) if ready_line else {}
+    if not handshake.get("ready"):
+        worker.kill()
+        await worker.wait()
+        raise RuntimeError(f"worker no arrancó: {handshake.get('error', 'sin handshake')}")
+    return worker
+
+
+# Referencias vivas a tareas en segundo plano (evita que el GC las cancele)
+_background_tasks: set = set()
+
+
+def _create_background_task(coro) -> None:
+    task = asyncio.get_running_loop().create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def _start_worker_pool() -> None:
+    """Spawn the persistent worker pool (runs in the background, once)"""
+    try:
+        pool = asyncio.Queue()
+        for _ in range(WORKER_POOL_SIZE):
+            pool.put_nowait(await _spawn_worker())
+        app.state.worker_pool = pool
+        logger.info(f"✅ Pool de {WORKER_POOL_SIZE} workers de búsqueda iniciado")
+    except Exception as e:
+        logger.warning(f"⚠️ Pool de workers no disponible, se usará CLI puntual: {e}")
+
+
+async def _worker_pool_search(query: str, method: str, **kwargs) -> Optional[Dict[str, Any]]:
+    """Run a search on a pooled worker; None means fall back to one-shot CLI.
+
+    The pool starts lazily on the first fallback: healthy deployments where
+    the in-process API always answers never pay the workers' startup or RSS.
+    """
+    pool = app.state.worker_pool
+    if pool is None:
+        if not app.state.worker_pool_starting:
+            app.state.worker_pool_starting = True
+            _create_background_task(_start_worker_pool())
+        return None
+
+    try:
+        # Sin espera: con el pool agotado (workers muertos sin relanzar, o
+        # más fallbacks concurrentes que workers) se usa el CLI puntual
+        worker = pool.get_nowait()
+    except asyncio.QueueEmpty:
+        return None
+    try:
+        request = {"query": query, "method": method, **kwargs}
+        worker.stdin.write(_dumps(request) + b"\n")
+        await worker.stdin.drain()
+        line = await asyncio.wait_for(worker.stdout.readline(), timeout=CFG.cli_timeout_seconds)
+        if not line:
+            raise RuntimeError("worker cerró stdout")
+        pool.put_nowait(worker)
+        return json.loads(line)
+    except Exception as e:
+        # Relanzar en segundo plano: el request ya va a usar el CLI puntual
+        # y no debe esperar además la carga de datos de un worker nuevo
+        logger.warning(f"⚠️ Worker CLI falló, relanzando en segundo plano: {e}")
+        worker.kill()
+        await worker.wait()
+        _create_background_task(_respawn_worker(pool))
+        return None
+
+
+async def _respawn_worker(pool: asyncio.Queue) -> None:
+    """Replace a dead pooled worker without blocking any request"""
+    try:
+        pool.put_nowait(await _spawn_worker())
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo relanzar el worker: {e}")
+
+
 # Fallback CLI functions
+_CLI_PREFIX = ("graphrag", "query", "--root", ".")
+
+# Extrae la respuesta tras el último "SUCCESS:", saltando la cabecera opcional,
+# en una sola pasada sobre el buffer (sin splits intermedios)
+_SUCCESS_RE = re.compile(
+    r".*SUCCESS:\s*(?:(?:Local|Global) Search Response:\s*)?(.*)", re.DOTALL
+)
+
 async def execute_cli_search(query: str, method: str, **kwargs) -> Dict[str, Any]:
-    """Execute GraphRAG search via CLI as fallback"""
+    """Execute GraphRAG search via a pooled worker, or one-shot CLI as last resort"""
+    result = await _worker_pool_search(query, method, **kwargs)
+    if result is not None:
+        return result
+
     start_time = time.time()
-    
-    cmd = [
-        "graphrag", "query",
-        "--root", ".",
-        "--method", method,
-        "--query", query
-    ]
-    
+
+    extras = ()
     if "community_level" in kwargs:
-        cmd.extend(["--community_level", str(kwargs["community_level"])])
+        extras += ("--community_level", str(kwargs["community_level"]))
     if "response_type" in kwargs:
-        cmd.extend(["--response_type", kwargs["response_type"]])
-    
+        extras += ("--response_type", kwargs["response_type"])
+    cmd = (*_CLI_PREFIX, "--method", method, "--query", query, *extras)
+
     logger.info(f"🔄 CLI Fallback: {' '.join(cmd[:6])}...")
-    
+
     try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=300,
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
             cwd="."
         )
-        
-        execution_time = time.time() - start_time
-        
-        if result.returncode == 0:
-            response_text = result.stdout.strip()
-            
-            # Extract clean response
-            if "SUCCESS:" in response_text:
-                response_parts = response_text.split("SUCCESS:")
-                if len(response_parts) > 1:
-                    response_text = response_parts[-1].strip()
-                    if response_text.startswith(("Local Search Response:", "Global Search Response:")):
-                        response_text = "\n".join(response_text.split("\n")[1:]).strip()
-            
-            return {
-                "response": response_text,
-                "context_data": {"method": "cli_fallback", "execution_time": execution_time},
-                "success": True,
-                "method_used": "cli"
-            }
-        else:
-            return {
-                "response": f"CLI Error: {result.stderr}",
-                "context_data": {"error": result.stderr},
-                "success": False,
-                "method_used": "cli"
-            }
-            
-    except Exception as e:
+    except OSError as e:
         return {
             "response": f"CLI Exception: {str(e)}",
             "context_data": {"error": str(e)},
@@ -135,43 +518,143 @@ async def execute_cli_search(query: str, method: str, **kwargs) -> Dict[str, Any
             "method_used": "cli"
         }
 
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=CFG.cli_timeout_seconds)
+    except asyncio.TimeoutError:
+        # Matar el proceso para no acumular zombies de graphrag
+        process.kill()
+        await process.wait()
+        error = f"CLI timeout tras {CFG.cli_timeout_seconds}s"
+        return {
+            "response": f"CLI Exception: {error}",
+            "context_data": {"error": error},
+            "success": False,
+            "method_used": "cli"
+        }
+
+    execution_time = time.time() - start_time
+
+    if process.returncode == 0:
+        response_text = stdout.decode().strip()
+
+        # Extract clean response
+        match = _SUCCESS_RE.match(response_text)
+        if match:
+            response_text = match.group(1).strip()
+
+        return {
+            "response": response_text,
+            "context_data": {"method": "cli_fallback", "execution_time": execution_time},
+            "success": True,
+            "method_used": "cli"
+        }
+    else:
+        stderr_text = stderr.decode()
+        return {
+            "response": f"CLI Error: {stderr_text}",
+            "context_data": {"error": stderr_text},
+            "success": False,
+            "method_used": "cli"
+        }
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan management"""
     logger.info("🚀 Iniciando GraphRAG API...")
-    
+
+    # Cache de búsquedas (exacta + semántica)
+    if CACHETOOLS_AVAILABLE:
+        app.state.exact_cache = TTLCache(maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL_SECONDS)
+    else:
+        app.state.exact_cache = SimpleTTLCache(maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL_SECONDS)
+    app.state.semantic_enabled = False
+    app.state.semantic_indexes = {}  # method -> faiss.IndexFlatIP (lazy)
+    app.state.semantic_keys = {}     # method -> claves alineadas con su índice
+    app.state.inflight = {}  # key -> asyncio.Future de la búsqueda en curso
+    if SEMANTIC_CACHE_AVAILABLE:
+        try:
+            app.state.query_embedder = SentenceTransformer(SEMANTIC_CACHE_MODEL)
+            app.state.semantic_dimension = app.state.query_embedder.get_sentence_embedding_dimension()
+            app.state.semantic_enabled = True
+            logger.info(f"✅ Cache semántica inicializada (dim={app.state.semantic_dimension})")
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo inicializar la cache semántica: {e}")
+
     # Cargar datos
     try:
         if GRAPHRAG_API_AVAILABLE:
             logger.info("📋 Cargando configuración GraphRAG...")
-            app.state.config = load_config(Path(PROJECT_DIRECTORY))
+            app.state.config = load_config(CFG.root)
             
             logger.info("📊 Cargando archivos parquet...")
-            app.state.entities = pd.read_parquet(f"{PROJECT_DIRECTORY}/output/entities.parquet")
-            app.state.communities = pd.read_parquet(f"{PROJECT_DIRECTORY}/output/communities.parquet")
-            app.state.community_reports = pd.read_parquet(f"{PROJECT_DIRECTORY}/output/community_reports.parquet")
-            app.state.text_units = pd.read_parquet(f"{PROJECT_DIRECTORY}/output/text_units.parquet")
-            app.state.relationships = pd.read_parquet(f"{PROJECT_DIRECTORY}/output/relationships.parquet")
+            pa.set_cpu_count(os.cpu_count() or 1)  # decodificar row groups en paralelo
+            app.state.entities = load_frame(CFG.parquet_path("entities"), "entities")
+            app.state.communities = load_frame(CFG.parquet_path("communities"), "communities")
+            app.state.community_reports = load_frame(CFG.parquet_path("community_reports"), "community_reports")
+            app.state.text_units = load_frame(CFG.parquet_path("text_units"), "text_units")
+            app.state.relationships = load_frame(CFG.parquet_path("relationships"), "relationships")
             
             # Covariates (opcional)
             try:
-                app.state.covariates = pd.read_parquet(f"{PROJECT_DIRECTORY}/output/covariates.parquet") if CLAIM_EXTRACTION_ENABLED else None
+                app.state.covariates = pd.read_parquet(CFG.parquet_path("covariates")) if CFG.claim_extraction_enabled else None
             except:
                 app.state.covariates = None
                 logger.info("ℹ️ Covariates no disponibles")
             
+            # Precalcular registros de los frames de referencia inmutables para
+            # que process_context_data no repita to_dict('records') por request
+            app.state.records_by_id = {}
+            for name in ("communities", "community_reports"):
+                frame = getattr(app.state, name)
+                if "id" in frame.columns:
+                    app.state.records_by_id[name] = (
+                        frozenset(frame.columns),
+                        {record["id"]: record for record in frame.to_dict(orient="records")},
+                    )
+
+            # Índice vectorial de entidades para búsquedas local/drift
+            app.state.entity_index = None
+            if SEMANTIC_CACHE_AVAILABLE:
+                try:
+                    _build_entity_index(app.state.entities)
+                except Exception as e:
+                    logger.warning(f"⚠️ No se pudo construir el índice de entidades: {e}")
+
             logger.info(f"✅ Datos cargados: {len(app.state.entities)} entidades, {len(app.state.relationships)} relaciones")
             app.state.data_loaded = True
         else:
             logger.info("⚠️ GraphRAG API no disponible, usando solo CLI fallback")
             app.state.data_loaded = False
-            
+
     except Exception as e:
         logger.error(f"❌ Error cargando datos: {e}")
         app.state.data_loaded = False
-    
+
+    # Pool de workers persistentes para el fallback CLI: arranque diferido.
+    # Se lanza al primer uso del fallback (vía _worker_pool_search) para que
+    # los despliegues sanos no paguen sus cargas de datos ni su RSS extra
+    app.state.worker_pool = None
+    app.state.worker_pool_starting = False
+
+    # El estado ya no cambia: precodificar la respuesta de /status una vez
+    app.state.status_bytes = _dumps({
+        "status": "Server is up and running",
+        "graphrag_api_available": GRAPHRAG_API_AVAILABLE,
+        "data_loaded": app.state.data_loaded,
+        "fallback_mode": "CLI available" if not GRAPHRAG_API_AVAILABLE else "API + CLI fallback",
+        "worker_pool": "on_demand",
+        "project_directory": str(CFG.root),
+        "community_level": CFG.community_level,
+        "response_type": CFG.response_type
+    })
+
     yield
-    
+
+    if app.state.worker_pool is not None:
+        while not app.state.worker_pool.empty():
+            worker = app.state.worker_pool.get_nowait()
+            worker.terminate()
+
     logger.info("👋 Cerrando GraphRAG API...")
 
 app = FastAPI(
@@ -189,7 +672,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Los context_data pueden ser megabytes de JSON: comprimir el egress
+# (sin Content-Length fijo, compatible con las respuestas en streaming)
+if BROTLI_AVAILABLE:
+    app.add_middleware(BrotliMiddleware, quality=4, minimum_size=2048)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=2048, compresslevel=5)
+
 @app.get("/search/global")
+@cached_search(method="global")
 async def global_search(query: str = Query(..., description="Global Search")):
     """Global search with API + CLI fallback"""
     logger.info(f"🌍 Global search: {query}")
@@ -203,20 +694,20 @@ async def global_search(query: str = Query(..., description="Global Search")):
                 entities=app.state.entities,
                 communities=app.state.communities,
                 community_reports=app.state.community_reports,
-                community_level=COMMUNITY_LEVEL,
+                community_level=CFG.community_level,
                 dynamic_community_selection=False,
-                response_type=RESPONSE_TYPE,
+                response_type=CFG.response_type,
                 query=query,
             )
             
             response_dict = {
                 "response": response,
-                "context_data": process_context_data(context),
+                "context_data": await asyncio.to_thread(process_context_data, context),
                 "method_used": "api",
                 "success": True
             }
             logger.info("✅ Global search API exitosa")
-            return JSONResponse(content=response_dict)
+            return response_dict
             
         except Exception as e:
             logger.warning(f"⚠️ GraphRAG API falló: {e}")
@@ -226,16 +717,17 @@ async def global_search(query: str = Query(..., description="Global Search")):
     result = await execute_cli_search(
         query=query, 
         method="global",
-        community_level=COMMUNITY_LEVEL,
-        response_type=RESPONSE_TYPE
+        community_level=CFG.community_level,
+        response_type=CFG.response_type
     )
     
     if not result["success"]:
         raise HTTPException(status_code=500, detail=result["response"])
-    
-    return JSONResponse(content=result)
+
+    return result
 
 @app.get("/search/local")
+@cached_search(method="local")
 async def local_search(query: str = Query(..., description="Local Search")):
     """Local search with API + CLI fallback"""
     logger.info(f"🎯 Local search: {query}")
@@ -252,19 +744,19 @@ async def local_search(query: str = Query(..., description="Local Search")):
                 text_units=app.state.text_units,
                 relationships=app.state.relationships,
                 covariates=app.state.covariates,
-                community_level=COMMUNITY_LEVEL,
-                response_type=RESPONSE_TYPE,
+                community_level=CFG.community_level,
+                response_type=CFG.response_type,
                 query=query,
             )
             
             response_dict = {
                 "response": response,
-                "context_data": process_context_data(context),
+                "context_data": await asyncio.to_thread(process_context_data, context),
                 "method_used": "api",
                 "success": True
             }
             logger.info("✅ Local search API exitosa")
-            return JSONResponse(content=response_dict)
+            return response_dict
             
         except Exception as e:
             logger.warning(f"⚠️ GraphRAG API falló: {e}")
@@ -274,16 +766,17 @@ async def local_search(query: str = Query(..., description="Local Search")):
     result = await execute_cli_search(
         query=query, 
         method="local",
-        community_level=COMMUNITY_LEVEL,
-        response_type=RESPONSE_TYPE
+        community_level=CFG.community_level,
+        response_type=CFG.response_type
     )
     
     if not result["success"]:
         raise HTTPException(status_code=500, detail=result["response"])
-    
-    return JSONResponse(content=result)
+
+    return result
 
 @app.get("/search/drift")
+@cached_search(method="drift")
 async def drift_search(query: str = Query(..., description="DRIFT Search")):
     """DRIFT search with API + CLI fallback"""
     logger.info(f"🌊 DRIFT search: {query}")
@@ -299,19 +792,19 @@ async def drift_search(query: str = Query(..., description="DRIFT Search")):
                 community_reports=app.state.community_reports,
                 text_units=app.state.text_units,
                 relationships=app.state.relationships,
-                community_level=COMMUNITY_LEVEL,
-                response_type=RESPONSE_TYPE,
+                community_level=CFG.community_level,
+                response_type=CFG.response_type,
                 query=query,
             )
             
             response_dict = {
                 "response": response,
-                "context_data": process_context_data(context),
+                "context_data": await asyncio.to_thread(process_context_data, context),
                 "method_used": "api",
                 "success": True
             }
             logger.info("✅ DRIFT search API exitosa")
-            return JSONResponse(content=response_dict)
+            return response_dict
             
         except Exception as e:
             logger.warning(f"⚠️ GraphRAG API falló: {e}")
@@ -321,17 +814,18 @@ async def drift_search(query: str = Query(..., description="DRIFT Search")):
     result = await execute_cli_search(
         query=query, 
         method="local",  # Fallback a local
-        community_level=COMMUNITY_LEVEL,
-        response_type=RESPONSE_TYPE
+        community_level=CFG.community_level,
+        response_type=CFG.response_type
     )
     
     if not result["success"]:
         raise HTTPException(status_code=500, detail=result["response"])
     
     result["method_used"] = "cli_local_fallback"
-    return JSONResponse(content=result)
+    return result
 
 @app.get("/search/basic")
+@cached_search(method="basic")
 async def basic_search(query: str = Query(..., description="Basic Search")):
     """Basic search with API + CLI fallback"""
     logger.info(f"📄 Basic search: {query}")
@@ -348,12 +842,12 @@ async def basic_search(query: str = Query(..., description="Basic Search")):
             
             response_dict = {
                 "response": response,
-                "context_data": process_context_data(context),
+                "context_data": await asyncio.to_thread(process_context_data, context),
                 "method_used": "api",
                 "success": True
             }
             logger.info("✅ Basic search API exitosa")
-            return JSONResponse(content=response_dict)
+            return response_dict
             
         except Exception as e:
             logger.warning(f"⚠️ GraphRAG API falló: {e}")
@@ -363,56 +857,47 @@ async def basic_search(query: str = Query(..., description="Basic Search")):
     result = await execute_cli_search(
         query=query, 
         method="local",
-        community_level=COMMUNITY_LEVEL,
-        response_type=RESPONSE_TYPE
+        community_level=CFG.community_level,
+        response_type=CFG.response_type
     )
     
     if not result["success"]:
         raise HTTPException(status_code=500, detail=result["response"])
     
     result["method_used"] = "cli_basic_fallback"
-    return JSONResponse(content=result)
+    return result
 
-@app.get("/status")
-async def status():
-    """Status endpoint with detailed information"""
-    return JSONResponse(content={
-        "status": "Server is up and running",
-        "graphrag_api_available": GRAPHRAG_API_AVAILABLE,
-        "data_loaded": getattr(app.state, 'data_loaded', False),
-        "fallback_mode": "CLI available" if not GRAPHRAG_API_AVAILABLE else "API + CLI fallback",
-        "project_directory": PROJECT_DIRECTORY,
-        "community_level": COMMUNITY_LEVEL,
-        "response_type": RESPONSE_TYPE
-    })
+_HEALTH_BYTES = _dumps({"status": "healthy"})
 
 @app.get("/")
-async def root():
-    """Root endpoint"""
-    return await status()
+@app.get("/status")
+async def status():
+    """Status endpoint: serves the payload precomputed at startup"""
+    return Response(content=app.state.status_bytes, media_type="application/json")
 
 @app.get("/health")
 async def health():
     """Simple health check"""
-    return {"status": "healthy"}
+    return Response(content=_HEALTH_BYTES, media_type="application/json")
 
 # Endpoints adicionales para compatibilidad con tu API anterior
+_METHODS = {
+    "global": global_search,
+    "local": local_search,
+    "drift": drift_search,
+    "basic": basic_search,
+}
+
 @app.get("/query")
 async def query_get(
     q: str = Query(..., description="Query"),
     method: str = Query("global", description="Search method")
 ):
     """Query endpoint for backward compatibility"""
-    if method == "global":
-        return await global_search(q)
-    elif method == "local":
-        return await local_search(q)
-    elif method == "drift":
-        return await drift_search(q)
-    elif method == "basic":
-        return await basic_search(q)
-    else:
+    handler = _METHODS.get(method)
+    if handler is None:
         raise HTTPException(status_code=400, detail="Invalid method. Use: global, local, drift, or basic")
+    return await handler(q)
 
 if __name__ == "__main__":
     print("🚀 GraphRAG API - Versión Híbrida")
@@ -428,8 +913,11 @@ if __name__ == "__main__":
     print("")
     
     uvicorn.run(
-        app, 
-        host="0.0.0.0", 
+        "main:app",
+        host="0.0.0.0",
         port=8000,
-        log_level="info"
+        log_level="info",
+        loop="uvloop" if UVLOOP_AVAILABLE else "asyncio",
+        http="httptools" if HTTPTOOLS_AVAILABLE else "h11",
+        workers=max(1, (os.cpu_count() or 2) // 2)
     )
\ No newline at end of file
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+GraphRAG worker persistente
+Carga configuración y parquet una sola vez y atiende búsquedas por
+stdin/stdout (una línea JSON por petición), evitando arrancar un
+intérprete nuevo por cada fallback CLI.
+Ejecutar desde: ragtest (lo lanza main.py, no está pensado para uso manual)
+"""
+
+import asyncio
+import json
+import logging
+import sys
+import time
+
+import pandas as pd
+
+# Logs a stderr: stdout es el canal de respuestas
+logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+logger = logging.getLogger(__name__)
+
+from config import CFG
+from loaders import load_frame
+
+try:
+    import graphrag.api as api
+    from graphrag.config.load_config import load_config
+    GRAPHRAG_API_AVAILABLE = True
+    logger.info("✅ GraphRAG API disponible en worker")
+except ImportError as e:
+    GRAPHRAG_API_AVAILABLE = False
+    logger.warning(f"⚠️ GraphRAG API no disponible en worker: {e}")
+
+
+def _load_state():
+    """Load config and parquet frames once for the lifetime of the worker.
+
+    Uses the same projected/optimized loader as main.py, so the worker reads
+    the memory-mapped Arrow IPC sidecars the server already wrote instead of
+    paying a second full-size parquet decode.
+    """
+    state = {"config": load_config(CFG.root)}
+    for name in ("entities", "communities", "community_reports", "text_units", "relationships"):
+        state[name] = load_frame(CFG.parquet_path(name), name)
+    try:
+        state["covariates"] = pd.read_parquet(CFG.parquet_path("covariates")) if CFG.claim_extraction_enabled else None
+    except Exception:
+        state["covariates"] = None
+    logger.info(f"✅ Worker listo: {len(state['entities'])} entidades")
+    return state
+
+
+async def _run_search(state, request):
+    """Execute one search request against the in-process GraphRAG API"""
+    method = request.get("method", "global")
+    query = request["query"]
+    community_level = request.get("community_level", 2)
+    response_type = request.get("response_type", "Multiple Paragraphs")
+    start_time = time.time()
+
+    try:
+        if method == "global":
+            response, _ = await api.global_search(
+                config=state["config"],
+                entities=state["entities"],
+                communities=state["communities"],
+                community_reports=state["community_reports"],
+                community_level=community_level,
+                dynamic_community_selection=False,
+                response_type=response_type,
+                query=query,
+            )
+        elif method == "drift":
+            response, _ = await api.drift_search(
+                config=state["config"],
+                entities=state["entities"],
+                communities=state["communities"],
+                community_reports=state["community_reports"],
+                text_units=state["text_units"],
+                relationships=state["relationships"],
+                community_level=community_level,
+                response_type=response_type,
+                query=query,
+            )
+        elif method == "basic":
+            response, _ = await api.basic_search(
+                config=state["config"],
+                text_units=state["text_units"],
+                query=query,
+            )
+        else:  # local (también el fallback por defecto)
+            response, _ = await api.local_search(
+                config=state["config"],
+                entities=state["entities"],
+                communities=state["communities"],
+                community_reports=state["community_reports"],
+                text_units=state["text_units"],
+                relationships=state["relationships"],
+                covariates=state["covariates"],
+                community_level=community_level,
+                response_type=response_type,
+                query=query,
+            )
+
+        return {
+            "response": response,
+            "context_data": {"method": "worker", "execution_time": time.time() - start_time},
+            "success": True,
+            "method_used": "cli_worker"
+        }
+    except Exception as e:
+        return {
+            "response": f"Worker Error: {str(e)}",
+            "context_data": {"error": str(e)},
+            "success": False,
+            "method_used": "cli_worker"
+        }
+
+
+def main():
+    if not GRAPHRAG_API_AVAILABLE:
+        print(json.dumps({"ready": False, "error": "graphrag api unavailable"}), flush=True)
+        sys.exit(1)
+
+    state = _load_state()
+    print(json.dumps({"ready": True}), flush=True)
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            request = json.loads(line)
+            result = asyncio.run(_run_search(state, request))
+        except Exception as e:
+            result = {
+                "response": f"Worker Exception: {str(e)}",
+                "context_data": {"error": str(e)},
+                "success": False,
+                "method_used": "cli_worker"
+            }
+        print(json.dumps(result), flush=True)
+
+
+if __name__ == "__main__":
+    main()